@@ -0,0 +1,175 @@
+"""Admission control for the expensive blend endpoints.
+
+At most ``max_active`` solves run at once. Requests over that limit wait in a
+bounded queue, and once the queue is full they get an immediate 503 with
+Retry-After instead of making everyone slower. There are two lanes:
+
+  * ``interactive``: counter and sales-rep traffic. Always served first.
+  * ``bulk``: batch tools, repricing and scheduling. These get a shorter
+    queue and may hold at most ``bulk_max_active`` slots, so one slot is
+    always left for the counter.
+
+Everything runs on the event loop, so no locking is needed.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, status
+
+LANES = ("interactive", "bulk")
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_active: int,
+        max_queue: Dict[str, int],
+        max_wait: float,
+        retry_after: int,
+        bulk_max_active: Optional[int] = None,
+    ):
+        self.max_active = max(1, max_active)
+        self.max_queue = max_queue
+        if self.max_active > 1:
+            # Bulk may never take the last slot; that one is for the counter.
+            ceiling = self.max_active - 1
+            self.bulk_max_active = max(1, min(bulk_max_active or ceiling, ceiling))
+        else:
+            logger.warning("max_active is 1, so no slot can be reserved for interactive blends")
+            self.bulk_max_active = 1
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.active = {lane: 0 for lane in LANES}
+        self.waiting = {lane: deque() for lane in LANES}
+        self.admitted = {lane: 0 for lane in LANES}
+        self.rejected = {lane: 0 for lane in LANES}
+        self.timed_out = {lane: 0 for lane in LANES}
+
+    def _can_run(self, lane: str) -> bool:
+        if sum(self.active.values()) >= self.max_active:
+            return False
+        if lane == "bulk":
+            return self.active["bulk"] < self.bulk_max_active and not self.waiting["interactive"]
+        return True
+
+    def _reject(self, lane: str, reason: str):
+        self.rejected[lane] += 1
+        raise AdmissionRejected(lane, reason, self.retry_after)
+
+    async def acquire(self, lane: str):
+        if not self.waiting[lane] and self._can_run(lane):
+            self.active[lane] += 1
+            self.admitted[lane] += 1
+            return
+        if len(self.waiting[lane]) >= self.max_queue[lane]:
+            self._reject(lane, "queue full")
+        fut = asyncio.get_running_loop().create_future()
+        self.waiting[lane].append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.max_wait)
+        except asyncio.TimeoutError:
+            if fut.done():
+                # Granted right as the timer fired; keep the slot.
+                return
+            self.waiting[lane].remove(fut)
+            fut.cancel()
+            self.timed_out[lane] += 1
+            self._dispatch()
+            self._reject(lane, "timed out waiting for a slot")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(lane)
+            elif fut in self.waiting[lane]:
+                self.waiting[lane].remove(fut)
+                self._dispatch()
+            raise
+
+    def release(self, lane: str):
+        self.active[lane] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        # Hand free slots to waiters, interactive lane first.
+        for lane in LANES:
+            while self.waiting[lane] and self._can_run(lane):
+                fut = self.waiting[lane].popleft()
+                if fut.done():
+                    continue
+                self.active[lane] += 1
+                self.admitted[lane] += 1
+                fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def metrics(self):
+        return {
+            "max_active": self.max_active,
+            "bulk_max_active": self.bulk_max_active,
+            "lanes": {
+                lane: {
+                    "active": self.active[lane],
+                    "queued": len(self.waiting[lane]),
+                    "max_queue": self.max_queue[lane],
+                    "admitted": self.admitted[lane],
+                    "rejected": self.rejected[lane],
+                    "timed_out": self.timed_out[lane],
+                }
+                for lane in LANES
+            },
+        }
+
+def _default_max_active() -> int:
+    return max(2, os.cpu_count() or 2)
+
+blend_admission = AdmissionController(
+    max_active=int(os.getenv("BLEND_MAX_ACTIVE", str(_default_max_active()))),
+    max_queue={
+        "interactive": int(os.getenv("BLEND_MAX_QUEUE", "32")),
+        "bulk": int(os.getenv("BLEND_BULK_MAX_QUEUE", "8")),
+    },
+    max_wait=float(os.getenv("BLEND_MAX_WAIT_SECONDS", "10")),
+    retry_after=int(os.getenv("BLEND_RETRY_AFTER_SECONDS", "2")),
+    # Defaults to BLEND_MAX_ACTIVE - 1.
+    bulk_max_active=int(os.getenv("BLEND_BULK_MAX_ACTIVE", "0")) or None,
+)
+
+def request_lane(request: Request, default_lane: str) -> str:
+    """Lane for a request. ``X-Priority: bulk`` can only lower priority, so
+    bulk endpoints stay in the bulk lane whatever the client sends."""
+    if request.headers.get("X-Priority", "").lower() == "bulk":
+        return "bulk"
+    return default_lane
+
+@asynccontextmanager
+async def admitted(lane: str):
+    """Hold a blend slot, turning a rejection into 503 + Retry-After."""
+    try:
+        await blend_admission.acquire(lane)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Blend service busy ({e.reason}), retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        yield lane
+    finally:
+        blend_admission.release(lane)
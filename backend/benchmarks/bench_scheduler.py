@@ -0,0 +1,58 @@
+"""Time budget for scheduler.plan_run.
+
+Plans a synthetic day of blends (random ingredient sets, about 30% chemical
+treated) and fails (exit 1) if the median run exceeds SCHEDULE_BUDGET_MS.
+
+    cd backend && python benchmarks/bench_scheduler.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scheduler  # noqa: E402
+
+BLENDS = int(os.getenv("SCHEDULE_BLENDS", "500"))
+RUNS = int(os.getenv("SCHEDULE_RUNS", "5"))
+BUDGET_MS = float(os.getenv("SCHEDULE_BUDGET_MS", "1000"))
+
+def make_day(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    ingredients = [
+        SimpleNamespace(id=i, name=f"Ingredient {i}", density=rng.uniform(40, 80), blend_order=rng.randint(0, 10))
+        for i in range(30)
+    ]
+    blends = []
+    for b in range(n):
+        chosen = rng.sample(ingredients, rng.randint(2, 6))
+        chems = [] if rng.random() < 0.7 else rng.sample([1, 2, 3, 4], rng.randint(1, 2))
+        blends.append(SimpleNamespace(
+            id=b,
+            customer=SimpleNamespace(name=f"Customer {b % 40}"),
+            ingredients=[
+                SimpleNamespace(ingredient=ing, ingredient_id=ing.id, weight=rng.uniform(500, 20000))
+                for ing in chosen
+            ],
+            chemicals=[SimpleNamespace(chemical_id=c) for c in chems],
+        ))
+    return blends
+
+def main():
+    blends = make_day(BLENDS)
+    timings = []
+    for _ in range(RUNS):
+        t = time.perf_counter()
+        sheet = scheduler.plan_run(blends)
+        timings.append((time.perf_counter() - t) * 1000)
+    median = statistics.median(timings)
+    print(f"plan_run({BLENDS} blends, {sheet['total_batches']} batches): median {median:.1f} ms, "
+          f"max {max(timings):.1f} ms over {RUNS} runs (budget {BUDGET_MS:.0f} ms)")
+    if median > BUDGET_MS:
+        print(f"FAIL: over schedule budget by {median - BUDGET_MS:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Import-time check for the API module.
+
+Hard gate: importing ``main`` in a fresh interpreter must not pull in the
+modules that are meant to load lazily (NumPy, passlib/bcrypt). If it does,
+the script exits 1.
+
+Timing: in the same run, the script also times importing just the third-party
+framework modules ``main`` is built on. It reports how much ``import main``
+adds on top of that baseline. Both numbers come from the same machine and
+run, so the overhead ratio can be compared across hosts, unlike an absolute
+number of milliseconds. The ratio is informational unless IMPORT_MAX_RATIO
+is set (e.g. 1.5 = main may add at most 50% of the baseline). With it set,
+going over fails the run.
+
+    cd backend && python benchmarks/bench_startup.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(os.getenv("IMPORT_RUNS", "7"))
+MAX_RATIO = float(os.getenv("IMPORT_MAX_RATIO", "0")) or None
+LAZY_MODULES = ("numpy", "passlib", "bcrypt")
+
+BASELINE_IMPORTS = (
+    "fastapi, fastapi.security, fastapi.middleware.cors, fastapi.encoders, "
+    "sqlalchemy, sqlalchemy.orm, pydantic, dotenv, jose"
+)
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import {imports}
+elapsed = (time.perf_counter() - t) * 1000
+eager = [m for m in {lazy!r} if m in sys.modules]
+print(elapsed, ",".join(eager))
+"""
+
+def _probe(imports: str):
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(imports=imports, lazy=LAZY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {imports} failed:\n{proc.stderr}")
+    out = proc.stdout.split()
+    return float(out[0]), set(out[1].split(",")) if len(out) > 1 else set()
+
+def measure():
+    # Interleave the two probes so drift on a busy machine affects both alike.
+    baseline, full = [], []
+    eager = set()
+    for _ in range(RUNS):
+        baseline.append(_probe(BASELINE_IMPORTS)[0])
+        elapsed, found = _probe("main")
+        full.append(elapsed)
+        eager |= found
+    return baseline, full, eager
+
+def main():
+    baseline, full, eager = measure()
+    base_ms = statistics.median(baseline)
+    main_ms = statistics.median(full)
+    ratio = main_ms / base_ms if base_ms else float("inf")
+    print(f"framework baseline: median {base_ms:.1f} ms; import main: median {main_ms:.1f} ms "
+          f"(+{main_ms - base_ms:.1f} ms, {ratio:.2f}x baseline) over {RUNS} runs")
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(sorted(eager))}")
+        failed = True
+    if MAX_RATIO is not None and ratio > MAX_RATIO:
+        print(f"FAIL: import main is {ratio:.2f}x the framework baseline (limit {MAX_RATIO:.2f}x)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
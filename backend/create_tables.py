@@ -1,5 +1,28 @@
-from db import Base, engine
+from sqlalchemy import inspect, text
+from db import Base, engine, SessionLocal
 import models
+import crud
 
 Base.metadata.create_all(bind=engine)
+
+# create_all() skips tables that already exist, so add any new nullable
+# columns (e.g. blend_ingredients.snapshot_id) to older databases by hand.
+inspector = inspect(engine)
+with engine.begin() as conn:
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in existing and col.nullable:
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}"
+                ))
+                print(f"Added column {table.name}.{col.name}")
 print("All tables created!")
+
+# Existing catalogs need a starting snapshot before blends can be repriced.
+db = SessionLocal()
+added = crud.backfill_snapshots(db, models.Ingredient, models.IngredientSnapshot)
+added += crud.backfill_snapshots(db, models.Chemical, models.ChemicalSnapshot)
+db.commit()
+db.close()
+print(f"Backfilled {added} price snapshots")
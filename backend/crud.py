@@ -0,0 +1,176 @@
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Type
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import CatalogVersion
+
+# ---- Catalog version ----
+
+def get_catalog_version(db: Session) -> int:
+    return db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+
+def bump_catalog_version(db: Session) -> int:
+    """Increment the catalog version inside the caller's transaction."""
+    updated = (
+        db.query(CatalogVersion)
+        .filter(CatalogVersion.id == 1)
+        .update({CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(CatalogVersion(id=1, version=1))
+        db.flush()
+    return get_catalog_version(db)
+
+# ---- Price/analysis snapshots ----
+
+def utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    """Snapshots store naive UTC; normalise aware datetimes before comparing."""
+    if dt is not None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def record_snapshots(db: Session, snapshot_model, items: Iterable[Any], effective_at: Optional[datetime] = None):
+    """Append one history row per item, all sharing the same effective time."""
+    effective_at = utc_naive(effective_at) or datetime.utcnow()
+    rows = [
+        {
+            snapshot_model.item_key: item.id,
+            "effective_at": effective_at,
+            **{f: getattr(item, f) for f in snapshot_model.tracked_fields},
+        }
+        for item in items
+    ]
+    if rows:
+        db.bulk_insert_mappings(snapshot_model, rows)
+
+def snapshot_fields_changed(snapshot_model, item, updates: Dict[str, Any]) -> bool:
+    """True if applying ``updates`` to ``item`` would change a tracked field."""
+    return any(
+        k in snapshot_model.tracked_fields and getattr(item, k) != v
+        for k, v in updates.items()
+    )
+
+# Backfilled rows describe prices from before history was kept, so they must
+# cover every blend saved up to now; stamping them "now" would leave older
+# blends with no snapshot to price against.
+BACKFILL_EFFECTIVE_AT = datetime(1970, 1, 1)
+
+def backfill_snapshots(db: Session, model, snapshot_model) -> int:
+    """Give every item without history an initial snapshot (for pre-existing catalogs)."""
+    key = getattr(snapshot_model, snapshot_model.item_key)
+    items = db.query(model).filter(~model.id.in_(select(key))).all()
+    record_snapshots(db, snapshot_model, items, effective_at=BACKFILL_EFFECTIVE_AT)
+    return len(items)
+
+class SnapshotHistory:
+    """In-memory as-of index over snapshots loaded by ``load_snapshot_history``.
+
+    Lookups are a bisect over each item's effective times, so repricing many
+    blends costs one range query up front rather than one query per line item.
+    """
+
+    def __init__(self, snapshots: List[Any], item_key: str):
+        self.by_id = {s.id: s for s in snapshots}
+        self._times: Dict[int, List[datetime]] = {}
+        self._rows: Dict[int, List[Any]] = {}
+        for s in snapshots:  # already ordered by (item, effective_at, id)
+            item_id = getattr(s, item_key)
+            self._times.setdefault(item_id, []).append(utc_naive(s.effective_at))
+            self._rows.setdefault(item_id, []).append(s)
+
+    def as_of(self, item_id: int, when: datetime):
+        """Latest snapshot effective at or before ``when``, or None."""
+        times = self._times.get(item_id)
+        if not times:
+            return None
+        idx = bisect_right(times, utc_naive(when))
+        return self._rows[item_id][idx - 1] if idx else None
+
+def load_snapshot_history(db: Session, snapshot_model, item_ids: Iterable[int], until: datetime) -> SnapshotHistory:
+    key = getattr(snapshot_model, snapshot_model.item_key)
+    item_ids = list(set(item_ids))
+    snapshots = []
+    if item_ids:
+        snapshots = (
+            db.query(snapshot_model)
+            .filter(key.in_(item_ids), snapshot_model.effective_at <= utc_naive(until))
+            .order_by(key, snapshot_model.effective_at, snapshot_model.id)
+            .all()
+        )
+    return SnapshotHistory(snapshots, snapshot_model.item_key)
+
+# ---- Bulk upsert ----
+
+def bulk_upsert_by_name(
+    db: Session,
+    model,
+    rows: List[BaseModel],
+    create_schema: Type[BaseModel],
+    snapshot_model=None,
+) -> Dict[str, Any]:
+    """Upsert rows keyed on the model's unique ``name`` column.
+
+    Existing rows are loaded with one IN query, only fields that actually
+    differ are written, and all updates/inserts go out as one executemany per
+    kind. If ``snapshot_model`` is given, a history row is appended for every
+    added or changed item. Nothing is committed here; the caller commits once.
+    """
+    incoming: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        fields = row.dict(exclude_unset=True)
+        incoming.setdefault(row.name, {}).update(fields)
+
+    existing = {
+        obj.name: obj
+        for obj in db.query(model).filter(model.name.in_(list(incoming))).all()
+    } if incoming else {}
+
+    inserts, updates, added, changed = [], [], [], []
+    for name, fields in incoming.items():
+        obj = existing.get(name)
+        if obj is None:
+            try:
+                inserts.append(create_schema(**fields).dict())
+            except ValidationError as e:
+                missing = ", ".join(str(err["loc"][-1]) for err in e.errors())
+                raise HTTPException(status_code=400, detail=f"New row '{name}' is missing or has invalid fields: {missing}")
+            added.append(name)
+            continue
+        diff = {
+            k: {"old": getattr(obj, k), "new": v}
+            for k, v in fields.items()
+            if k != "name" and getattr(obj, k) != v
+        }
+        if diff:
+            updates.append({"id": obj.id, **{k: d["new"] for k, d in diff.items()}})
+            changed.append({"id": obj.id, "name": name, "changes": diff})
+
+    if updates:
+        db.bulk_update_mappings(model, updates)
+    if inserts:
+        db.bulk_insert_mappings(model, inserts)
+    if snapshot_model is not None and (added or changed):
+        touched = added + [c["name"] for c in changed]
+        record_snapshots(db, snapshot_model, db.query(model).populate_existing().filter(model.name.in_(touched)).all())
+
+    return {
+        "added": added,
+        "updated": changed,
+        "unchanged": len(incoming) - len(added) - len(changed),
+    }
+
+def parse_csv_rows(reader, row_schema: Type[BaseModel]) -> List[BaseModel]:
+    """Turn csv.DictReader rows into schema objects; blank cells are left unset."""
+    rows = []
+    for line_no, raw in enumerate(reader, start=2):
+        fields = {k.strip(): v.strip() for k, v in raw.items() if k and v is not None and v.strip() != ""}
+        try:
+            rows.append(row_schema(**fields))
+        except ValidationError as e:
+            bad = ", ".join(str(err["loc"][-1]) for err in e.errors())
+            raise HTTPException(status_code=400, detail=f"CSV line {line_no}: invalid fields: {bad}")
+    return rows
@@ -1,19 +1,60 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Body
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Body, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from db import SessionLocal
-from models import User, Ingredient, Chemical, Customer, Blend
+from sqlalchemy.orm import Session, selectinload
+from db import SessionLocal, engine
+from models import User, Ingredient, Chemical, Customer, Blend, BlendIngredient, IngredientSnapshot, ChemicalSnapshot
 import auth
-from pydantic import BaseModel
+import crud
+from admission import AdmissionRejected, admitted, blend_admission, request_lane
+import scheduler
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional, Dict, Any
+from datetime import date, datetime, time, timedelta
+import asyncio
 import csv
+import json
+import os
 from io import StringIO
-import numpy as np
+from contextlib import asynccontextmanager
+from sqlalchemy import text
 
 # ---- FastAPI setup ----
 
-app = FastAPI()
+# Heavy modules (NumPy, passlib/bcrypt) are imported lazily so that importing
+# this module stays fast; the lifespan hook below pulls them in, opens the DB
+# pool and touches the catalog before the worker reports ready.
+
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", "2"))
+
+def warm_up():
+    import numpy  # noqa: F401  (solver)
+    auth.warm_up()
+    conns = [engine.connect() for _ in range(max(1, DB_POOL_WARM))]
+    try:
+        for conn in conns:
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conns:
+            conn.close()
+    db = SessionLocal()
+    try:
+        db.query(Ingredient).all()
+        db.query(Chemical).all()
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    await run_in_threadpool(warm_up)
+    app.state.ready = True
+    yield
+    app.state.ready = False
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +89,39 @@ def get_current_admin(user: User = Depends(get_current_user)):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough privileges")
     return user
 
+def blend_slot(default_lane: str = "interactive"):
+    """Dependency that holds a blend slot (see admission.py) for the request.
+
+    Authentication runs first so anonymous callers never queue. The session's
+    pooled connection is then handed back before waiting; otherwise every
+    queued request would pin a connection and starve cheap routes like /me.
+    The endpoint's own queries check a connection out again once admitted.
+    """
+    async def dependency(request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+        await run_in_threadpool(db.rollback)
+        async with admitted(request_lane(request, default_lane)) as lane:
+            yield lane
+    return dependency
+
+# ---- HEALTH ----
+
+@app.get("/ready")
+def ready():
+    # uvicorn only serves once lifespan startup is done, so the flag matters
+    # during shutdown; the DB ping is what catches a worker that lost its database.
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Shutting down")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+    return {"status": "ready"}
+
+@app.get("/metrics/admission")
+def admission_metrics(user: User = Depends(get_current_user)):
+    return blend_admission.metrics()
+
 # ---- AUTH ----
 
 @app.post("/token")
@@ -70,6 +144,12 @@ def read_users_me(current_user: User = Depends(get_current_user)):
 def admin_test(current_user: User = Depends(get_current_admin)):
     return {"msg": f"Hello, admin {current_user.username}!"}
 
+# ---- CATALOG VERSION ----
+
+@app.get("/catalog/version")
+def catalog_version(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    return {"version": crud.get_catalog_version(db)}
+
 # ---- INGREDIENTS ----
 
 class IngredientBase(BaseModel):
@@ -100,6 +180,9 @@ class IngredientOut(IngredientBase):
     class Config:
         from_attributes = True
 
+class IngredientBulkRow(IngredientUpdate):
+    name: str
+
 class OrderBody(BaseModel):
     order: List[int]
 
@@ -115,6 +198,9 @@ def get_ingredients(db: Session = Depends(get_db), user: User = Depends(get_curr
 def add_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
     db_ingredient = Ingredient(**ingredient.dict())
     db.add(db_ingredient)
+    db.flush()
+    crud.record_snapshots(db, IngredientSnapshot, [db_ingredient])
+    crud.bump_catalog_version(db)
     db.commit()
     db.refresh(db_ingredient)
     return db_ingredient
@@ -127,16 +213,36 @@ def reorder_ingredients(
 ):
     for idx, ingredient_id in enumerate(body.order):
         db.query(Ingredient).filter(Ingredient.id == ingredient_id).update({"blend_order": idx})
+    crud.bump_catalog_version(db)
     db.commit()
     return {"status": "ok"}
 
+@app.post("/ingredients/bulk")
+def bulk_upsert_ingredients(rows: List[IngredientBulkRow], db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    result = crud.bulk_upsert_by_name(db, Ingredient, rows, IngredientCreate, IngredientSnapshot)
+    if result["added"] or result["updated"]:
+        crud.bump_catalog_version(db)
+    db.commit()
+    result["catalog_version"] = crud.get_catalog_version(db)
+    return result
+
+@app.post("/ingredients/bulk/import")
+def bulk_import_ingredients_csv(file: UploadFile = File(...), db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    reader = csv.DictReader(StringIO(file.file.read().decode("utf-8-sig")))
+    return bulk_upsert_ingredients(crud.parse_csv_rows(reader, IngredientBulkRow), db, admin)
+
 @app.put("/ingredients/{ingredient_id}", response_model=IngredientOut)
 def update_ingredient(ingredient_id: int, updates: IngredientUpdate, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
     db_ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if not db_ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
-    for k, v in updates.dict(exclude_unset=True).items():
+    fields = updates.dict(exclude_unset=True)
+    reprice = crud.snapshot_fields_changed(IngredientSnapshot, db_ingredient, fields)
+    for k, v in fields.items():
         setattr(db_ingredient, k, v)
+    if reprice:
+        crud.record_snapshots(db, IngredientSnapshot, [db_ingredient])
+    crud.bump_catalog_version(db)
     db.commit()
     db.refresh(db_ingredient)
     return db_ingredient
@@ -147,6 +253,7 @@ def delete_ingredient(ingredient_id: int, db: Session = Depends(get_db), admin:
     if not db_ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
     db.delete(db_ingredient)
+    crud.bump_catalog_version(db)
     db.commit()
     return {"ok": True}
 
@@ -163,6 +270,9 @@ class ChemicalUpdate(BaseModel):
     ai_percent: Optional[float] = None
     cost_per_lb: Optional[float] = None
 
+class ChemicalBulkRow(ChemicalUpdate):
+    name: str
+
 class ChemicalOut(ChemicalBase):
     id: int
     class Config:
@@ -176,17 +286,39 @@ def get_chemicals(db: Session = Depends(get_db), user: User = Depends(get_curren
 def add_chemical(chemical: ChemicalCreate, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
     db_chemical = Chemical(**chemical.dict())
     db.add(db_chemical)
+    db.flush()
+    crud.record_snapshots(db, ChemicalSnapshot, [db_chemical])
+    crud.bump_catalog_version(db)
     db.commit()
     db.refresh(db_chemical)
     return db_chemical
 
+@app.post("/chemicals/bulk")
+def bulk_upsert_chemicals(rows: List[ChemicalBulkRow], db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    result = crud.bulk_upsert_by_name(db, Chemical, rows, ChemicalCreate, ChemicalSnapshot)
+    if result["added"] or result["updated"]:
+        crud.bump_catalog_version(db)
+    db.commit()
+    result["catalog_version"] = crud.get_catalog_version(db)
+    return result
+
+@app.post("/chemicals/bulk/import")
+def bulk_import_chemicals_csv(file: UploadFile = File(...), db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    reader = csv.DictReader(StringIO(file.file.read().decode("utf-8-sig")))
+    return bulk_upsert_chemicals(crud.parse_csv_rows(reader, ChemicalBulkRow), db, admin)
+
 @app.put("/chemicals/{chemical_id}", response_model=ChemicalOut)
 def update_chemical(chemical_id: int, updates: ChemicalUpdate, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
     db_chemical = db.query(Chemical).filter(Chemical.id == chemical_id).first()
     if not db_chemical:
         raise HTTPException(status_code=404, detail="Chemical not found")
-    for k, v in updates.dict(exclude_unset=True).items():
+    fields = updates.dict(exclude_unset=True)
+    reprice = crud.snapshot_fields_changed(ChemicalSnapshot, db_chemical, fields)
+    for k, v in fields.items():
         setattr(db_chemical, k, v)
+    if reprice:
+        crud.record_snapshots(db, ChemicalSnapshot, [db_chemical])
+    crud.bump_catalog_version(db)
     db.commit()
     db.refresh(db_chemical)
     return db_chemical
@@ -197,6 +329,7 @@ def delete_chemical(chemical_id: int, db: Session = Depends(get_db), admin: User
     if not db_chemical:
         raise HTTPException(status_code=404, detail="Chemical not found")
     db.delete(db_chemical)
+    crud.bump_catalog_version(db)
     db.commit()
     return {"ok": True}
 
@@ -217,6 +350,9 @@ class CustomerUpdate(BaseModel):
     phone: Optional[str] = None
     address: Optional[str] = None
 
+class CustomerBulkRow(CustomerUpdate):
+    name: str
+
 class CustomerOut(CustomerBase):
     id: int
     class Config:
@@ -234,6 +370,12 @@ def add_customer(customer: CustomerCreate, db: Session = Depends(get_db), admin:
     db.refresh(db_customer)
     return db_customer
 
+@app.post("/customers/bulk")
+def bulk_upsert_customers(rows: List[CustomerBulkRow], db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    result = crud.bulk_upsert_by_name(db, Customer, rows, CustomerCreate)
+    db.commit()
+    return result
+
 @app.put("/customers/{customer_id}", response_model=CustomerOut)
 def update_customer(customer_id: int, updates: CustomerUpdate, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
     db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
@@ -394,22 +536,33 @@ class BlendSheetOut(BaseModel):
     added_services: Optional[List[str]] = []
     application_rate: Optional[float] = None
 
-@app.post("/blend", response_model=BlendSheetOut)
-def calculate_blend(
-    blend_in: BlendInput = Body(...),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
-):
-    ingredients = db.query(Ingredient).filter(Ingredient.id.in_(blend_in.ingredient_ids)).all()
-    if len(ingredients) < 1:
-        raise HTTPException(status_code=400, detail="No valid ingredients selected")
-
-    mat = np.array([
+def blend_matrix(ingredients: List[Ingredient]):
+    import numpy as np
+    return np.array([
         [ing.analysis_n/100, ing.analysis_p/100, ing.analysis_k/100, ing.analysis_s/100]
         for ing in ingredients
     ]).T
 
+def solve_blend(
+    blend_in: BlendInput,
+    ingredients: List[Ingredient],
+    chemicals: Dict[int, Chemical],
+    mat=None,
+) -> BlendSheetOut:
+    """Run the least-squares solve for already-loaded ingredients and chemicals.
+
+    ``mat`` may be passed in when the caller keeps the ingredient matrix around
+    between solves (see the live blend socket below).
+    """
+    import numpy as np
+    if len(ingredients) < 1:
+        raise HTTPException(status_code=400, detail="No valid ingredients selected")
+    if mat is None:
+        mat = blend_matrix(ingredients)
+
     if blend_in.calculation_type == "analysis":
+        if not blend_in.total_weight:
+            raise HTTPException(status_code=400, detail="Total weight required for analysis calculation")
         target = np.array([
             blend_in.target_n * blend_in.total_weight / 100,
             blend_in.target_p * blend_in.total_weight / 100,
@@ -463,7 +616,7 @@ def calculate_blend(
     chemical_results = []
     if blend_in.chemicals:
         for chem_in in blend_in.chemicals:
-            chem = db.query(Chemical).filter(Chemical.id == chem_in.get("chemical_id")).first()
+            chem = chemicals.get(chem_in.get("chemical_id"))
             if chem:
                 lbs = float(chem_in.get("lbs_per_ton", 0)) * (sum_weights/2000)
                 cost = lbs * chem.cost_per_lb
@@ -497,6 +650,146 @@ def calculate_blend(
         application_rate=blend_in.application_rate,
     )
 
+def load_blend_chemicals(db: Session, chemicals_in: Optional[List[Dict[str, Any]]]) -> Dict[int, Chemical]:
+    ids = [c.get("chemical_id") for c in (chemicals_in or []) if c.get("chemical_id") is not None]
+    if not ids:
+        return {}
+    return {chem.id: chem for chem in db.query(Chemical).filter(Chemical.id.in_(ids)).all()}
+
+@app.post("/blend", response_model=BlendSheetOut)
+def calculate_blend(
+    blend_in: BlendInput = Body(...),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    lane: str = Depends(blend_slot("interactive")),
+):
+    ingredients = db.query(Ingredient).filter(Ingredient.id.in_(blend_in.ingredient_ids)).all()
+    chemicals = load_blend_chemicals(db, blend_in.chemicals)
+    return solve_blend(blend_in, ingredients, chemicals)
+
+# ---- LIVE BLEND (WebSocket) ----
+#
+# The calculator page can open one socket per session instead of posting a full
+# /blend request on every field change.  The token is checked once on connect
+# (browsers can't set headers on a WebSocket, so it comes in as ?token=...).
+# Each message is a JSON object of BlendInput fields to merge into the current
+# input, e.g. {"target_n": 18} or {"ingredient_ids": [1, 2, 3]}.  Messages are
+# coalesced until the client pauses for LIVE_BLEND_DEBOUNCE_MS, then one solve
+# runs and the latest BlendSheetOut is pushed back.  Errors come back in the
+# same {"detail": ...} shape as the HTTP endpoints.
+
+LIVE_BLEND_DEBOUNCE = float(os.getenv("LIVE_BLEND_DEBOUNCE_MS", "250")) / 1000
+
+class LiveBlendSession:
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.changed = asyncio.Event()
+        self.ingredient_ids: Optional[List[int]] = None
+        self.ingredients: List[Ingredient] = []
+        self.matrix = None
+        self.chemicals: Dict[int, Chemical] = {}
+        self.catalog_version: Optional[int] = None
+
+    def apply(self, delta: Dict[str, Any]):
+        self.fields.update(delta)
+        self.changed.set()
+
+    def solve(self) -> BlendSheetOut:
+        blend_in = BlendInput(**self.fields)
+        missing_chems = [
+            c.get("chemical_id") for c in (blend_in.chemicals or [])
+            if c.get("chemical_id") is not None and c.get("chemical_id") not in self.chemicals
+        ]
+        db = SessionLocal()
+        try:
+            # Drop the cached catalog when an admin has changed ingredients or chemicals.
+            version = crud.get_catalog_version(db)
+            if version != self.catalog_version:
+                self.catalog_version = version
+                self.ingredient_ids = None
+                self.chemicals = {}
+                missing_chems = [c.get("chemical_id") for c in (blend_in.chemicals or [])]
+            if blend_in.ingredient_ids != self.ingredient_ids:
+                self.ingredients = db.query(Ingredient).filter(Ingredient.id.in_(blend_in.ingredient_ids)).all()
+                self.matrix = blend_matrix(self.ingredients) if self.ingredients else None
+                self.ingredient_ids = list(blend_in.ingredient_ids)
+            if missing_chems:
+                self.chemicals.update(load_blend_chemicals(db, blend_in.chemicals))
+        finally:
+            db.close()
+        return solve_blend(blend_in, self.ingredients, self.chemicals, mat=self.matrix)
+
+async def _live_blend_worker(websocket: WebSocket, session: LiveBlendSession):
+    while True:
+        await session.changed.wait()
+        # Keep waiting until the client has been quiet for the debounce window.
+        while True:
+            session.changed.clear()
+            try:
+                await asyncio.wait_for(session.changed.wait(), LIVE_BLEND_DEBOUNCE)
+            except asyncio.TimeoutError:
+                break
+        try:
+            async with blend_admission.slot("interactive"):
+                result = jsonable_encoder(await run_in_threadpool(session.solve))
+        except AdmissionRejected as e:
+            await websocket.send_json({"detail": "Blend service busy, retrying", "retry_after": e.retry_after})
+            # Retry the latest input ourselves so the client still gets a result.
+            await asyncio.sleep(e.retry_after)
+            session.changed.set()
+            continue
+        except HTTPException as e:
+            result = {"detail": e.detail}
+        except ValidationError as e:
+            result = {"detail": "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )}
+        except Exception as e:
+            # Malformed deltas (e.g. non-numeric lbs_per_ton) must not kill the worker.
+            result = {"detail": f"Blend calculation error: {e}"}
+        if session.changed.is_set():
+            # Newer input arrived while solving; skip this stale result.
+            continue
+        await websocket.send_json(result)
+
+@app.websocket("/ws/blend")
+async def live_blend(websocket: WebSocket, token: str = Query(...)):
+    username = auth.verify_token(token)
+    user = None
+    if username:
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.username.ilike(username)).first()
+        finally:
+            db.close()
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    session = LiveBlendSession()
+    worker = asyncio.create_task(_live_blend_worker(websocket, session))
+
+    def _worker_done(task: asyncio.Task):
+        # If the worker dies the socket would never answer again; close it instead.
+        if not task.cancelled() and task.exception() is not None:
+            asyncio.create_task(websocket.close(code=status.WS_1011_INTERNAL_ERROR))
+
+    worker.add_done_callback(_worker_done)
+    try:
+        while True:
+            try:
+                delta = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if isinstance(delta, dict):
+                session.apply(delta)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: receive after the server side closed the socket.
+        pass
+    finally:
+        worker.cancel()
+
 # ---- BLEND LIST FOR TAG GENERATOR ----
 
 class BlendIngredientOut(BaseModel):
@@ -545,3 +838,130 @@ def get_blends(db: Session = Depends(get_db), user: User = Depends(get_current_u
             ingredients=ingredient_objs
         ))
     return result
+
+# ---- BLEND REPRICING ----
+
+class RepriceInput(BaseModel):
+    blend_ids: Optional[List[int]] = None  # all blends if omitted
+    as_of: Optional[datetime] = None       # now if omitted
+
+class BlendRepriceOut(BaseModel):
+    id: int
+    timestamp: Optional[datetime] = None
+    quoted_cost: Optional[float] = None
+    as_of_cost: Optional[float] = None
+
+def _price_blend(blend: Blend, when: datetime, ing_hist, chem_hist, pinned: bool) -> Optional[float]:
+    """Cost of a saved blend at ``when``; ``pinned`` prefers the snapshot it was saved with."""
+    total = 0.0
+    for bi in blend.ingredients:
+        snap = ing_hist.by_id.get(bi.snapshot_id) if pinned and bi.snapshot_id else None
+        snap = snap or ing_hist.as_of(bi.ingredient_id, when)
+        if snap is None:
+            return None
+        total += (bi.weight or 0) / 2000 * (snap.cost_per_ton or 0)
+    for bc in blend.chemicals:
+        snap = chem_hist.by_id.get(bc.snapshot_id) if pinned and bc.snapshot_id else None
+        snap = snap or chem_hist.as_of(bc.chemical_id, when)
+        if snap is None:
+            return None
+        total += (bc.weight or 0) * (snap.cost_per_lb or 0)
+    return round(total, 2)
+
+@app.post("/blends/reprice", response_model=List[BlendRepriceOut])
+def reprice_blends(
+    body: RepriceInput = Body(...),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    lane: str = Depends(blend_slot("bulk")),
+):
+    query = db.query(Blend).options(selectinload(Blend.ingredients), selectinload(Blend.chemicals))
+    if body.blend_ids is not None:
+        query = query.filter(Blend.id.in_(body.blend_ids))
+    blends = query.order_by(Blend.id).all()
+    as_of = crud.utc_naive(body.as_of) or datetime.utcnow()
+    until = max([as_of] + [crud.utc_naive(b.timestamp) for b in blends if b.timestamp])
+
+    # One range query per history table covers every blend and the as-of date.
+    ing_hist = crud.load_snapshot_history(
+        db, IngredientSnapshot, (bi.ingredient_id for b in blends for bi in b.ingredients), until)
+    chem_hist = crud.load_snapshot_history(
+        db, ChemicalSnapshot, (bc.chemical_id for b in blends for bc in b.chemicals), until)
+
+    return [
+        BlendRepriceOut(
+            id=b.id,
+            timestamp=b.timestamp,
+            quoted_cost=_price_blend(b, b.timestamp or as_of, ing_hist, chem_hist, pinned=True),
+            as_of_cost=_price_blend(b, as_of, ing_hist, chem_hist, pinned=False),
+        )
+        for b in blends
+    ]
+
+# ---- PRODUCTION SCHEDULING ----
+
+class ScheduleInput(BaseModel):
+    day: Optional[date] = None             # blends saved on this (UTC) day
+    blend_ids: Optional[List[int]] = None  # or an explicit list
+    mixer_capacity_cuft: Optional[float] = None
+    load_minutes: Optional[float] = None
+    mix_minutes: Optional[float] = None
+    discharge_minutes: Optional[float] = None
+    changeover_minutes: Optional[float] = None
+    cleanout_minutes: Optional[float] = None
+
+class BatchLineOut(BaseModel):
+    name: str
+    weight: float
+
+class BatchOut(BaseModel):
+    number: int
+    weight: float
+    volume_cuft: float
+    ingredients: List[BatchLineOut]
+
+class RunOut(BaseModel):
+    sequence: int
+    blend_id: int
+    customer: Optional[str] = None
+    total_weight: float
+    volume_cuft: float
+    treated: bool
+    cleanout_before: bool
+    changeover_ingredients: int
+    setup_minutes: float
+    start_minute: float
+    end_minute: float
+    batches: List[BatchOut]
+
+class RunSheetOut(BaseModel):
+    runs: List[RunOut]
+    total_batches: int
+    ingredient_changeovers: int
+    cleanouts: int
+    total_minutes: float
+
+@app.post("/schedule", response_model=RunSheetOut)
+def schedule_blends(
+    body: ScheduleInput = Body(...),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    lane: str = Depends(blend_slot("bulk")),
+):
+    if body.blend_ids is None and body.day is None:
+        raise HTTPException(status_code=400, detail="Provide a day or a list of blend_ids")
+    query = db.query(Blend).options(
+        selectinload(Blend.ingredients).selectinload(BlendIngredient.ingredient),
+        selectinload(Blend.chemicals),
+        selectinload(Blend.customer),
+    )
+    if body.blend_ids is not None:
+        query = query.filter(Blend.id.in_(body.blend_ids))
+    if body.day is not None:
+        start = datetime.combine(body.day, time.min)
+        query = query.filter(Blend.timestamp >= start, Blend.timestamp < start + timedelta(days=1))
+    settings = body.dict(exclude={"day", "blend_ids"})
+    try:
+        return scheduler.plan_run(query.order_by(Blend.id).all(), settings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
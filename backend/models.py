@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
@@ -81,6 +81,10 @@ class BlendIngredient(Base):
     blend_id = Column(Integer, ForeignKey("blends.id"))
     ingredient_id = Column(Integer, ForeignKey("ingredients.id"))
     weight = Column(Float)
+    # Price/analysis the blend was quoted at. Nothing saves blends yet, so this is
+    # NULL until a save path sets it; repricing then falls back to the snapshot
+    # effective at Blend.timestamp.
+    snapshot_id = Column(Integer, ForeignKey("ingredient_snapshots.id"), nullable=True)
     # Optional: Store micronutrient contribution per ingredient per blend (denormalized)
     blend = relationship("Blend", back_populates="ingredients")
     ingredient = relationship("Ingredient", back_populates="blend_ingredients")
@@ -91,5 +95,59 @@ class BlendChemical(Base):
     blend_id = Column(Integer, ForeignKey("blends.id"))
     chemical_id = Column(Integer, ForeignKey("chemicals.id"))
     weight = Column(Float)
+    snapshot_id = Column(Integer, ForeignKey("chemical_snapshots.id"), nullable=True)
     blend = relationship("Blend", back_populates="chemicals")
     chemical = relationship("Chemical")
+
+# Append-only price/analysis history. A new row is written every time an
+# ingredient or chemical is created or its tracked fields change; rows are
+# never updated. The item id is deliberately not a foreign key: history has
+# to survive deleting the ingredient or chemical it describes.
+
+class IngredientSnapshot(Base):
+    __tablename__ = "ingredient_snapshots"
+    item_key = "ingredient_id"
+    tracked_fields = (
+        "analysis_n", "analysis_p", "analysis_k", "analysis_s",
+        "analysis_b", "analysis_fe", "analysis_mn", "analysis_zn", "analysis_cu", "analysis_mo",
+        "density", "cost_per_ton",
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    ingredient_id = Column(Integer, nullable=False)
+    analysis_n = Column(Float)
+    analysis_p = Column(Float)
+    analysis_k = Column(Float)
+    analysis_s = Column(Float)
+    analysis_b = Column(Float)
+    analysis_fe = Column(Float)
+    analysis_mn = Column(Float)
+    analysis_zn = Column(Float)
+    analysis_cu = Column(Float)
+    analysis_mo = Column(Float)
+    density = Column(Float)
+    cost_per_ton = Column(Float)
+    effective_at = Column(DateTime, nullable=False)  # naive UTC
+    __table_args__ = (
+        Index("ix_ingredient_snapshots_item_effective", "ingredient_id", "effective_at"),
+    )
+
+class ChemicalSnapshot(Base):
+    __tablename__ = "chemical_snapshots"
+    item_key = "chemical_id"
+    tracked_fields = ("ai_percent", "cost_per_lb")
+    id = Column(Integer, primary_key=True, index=True)
+    chemical_id = Column(Integer, nullable=False)
+    ai_percent = Column(Float)
+    cost_per_lb = Column(Float)
+    effective_at = Column(DateTime, nullable=False)  # naive UTC
+    __table_args__ = (
+        Index("ix_chemical_snapshots_item_effective", "chemical_id", "effective_at"),
+    )
+
+class CatalogVersion(Base):
+    # Single row, bumped whenever ingredients or chemicals change so clients
+    # (and cached blend sessions) can tell their copy of the catalog is stale.
+    __tablename__ = "catalog_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
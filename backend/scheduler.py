@@ -0,0 +1,177 @@
+"""Production run sequencing for the mixer.
+
+Takes a day's saved blends and decides what order to run them in, how to
+split each one into mixer-sized batches, and roughly how long it all takes.
+
+Ordering rules:
+  * Blends with chemicals run last, so untreated product never follows a
+    treated one without a cleanout. Treated blends are grouped by chemical set,
+    and a cleanout is charged only when that set changes.
+  * Within a group, a greedy nearest-neighbour tour keeps blends with similar
+    ingredient sets next to each other. The changeover cost is the number of
+    ingredients that differ between one blend and the next.
+
+Ingredient sets are stored as int bitmasks, so one distance check is an XOR
+plus a popcount. A few hundred blends take only milliseconds.
+"""
+from math import ceil
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SETTINGS = {
+    "mixer_capacity_cuft": 100.0,     # usable mixer volume per batch
+    "load_minutes": 4.0,              # fill per batch
+    "mix_minutes": 3.0,               # mix per batch
+    "discharge_minutes": 3.0,         # empty per batch
+    "changeover_minutes": 1.5,        # per ingredient added/removed between blends
+    "cleanout_minutes": 20.0,         # full cleanout between different chemical treatments
+}
+
+def _mask(ids, bit_for: Dict[int, int]) -> int:
+    mask = 0
+    for i in ids:
+        mask |= 1 << bit_for.setdefault(i, len(bit_for))
+    return mask
+
+def _distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _greedy_order(items: List[Dict[str, Any]], start_mask: int) -> List[Dict[str, Any]]:
+    """Nearest-neighbour tour starting from the mixer's current ingredient set."""
+    remaining = list(items)
+    ordered = []
+    current = start_mask
+    while remaining:
+        # Ties go to the blend with the most ingredients in common, then
+        # heavier blends first so big runs don't drift to the end of the day.
+        best = min(
+            range(len(remaining)),
+            key=lambda i: (
+                _distance(current, remaining[i]["mask"]),
+                -bin(current & remaining[i]["mask"]).count("1"),
+                -remaining[i]["total_weight"],
+                remaining[i]["id"],
+            ),
+        )
+        item = remaining.pop(best)
+        ordered.append(item)
+        current = item["mask"]
+    return ordered
+
+def _split_batches(lines: List[Dict[str, Any]], volume: float, capacity: float) -> List[Dict[str, Any]]:
+    if volume <= 0:
+        # Nothing to load (no lines, or all weights zero): no batches, no mixer time.
+        return []
+    count = max(1, ceil(volume / capacity - 1e-9))
+    batches = []
+    for n in range(1, count + 1):
+        batch_lines = [
+            {"name": line["name"], "weight": round(line["weight"] / count, 2)}
+            for line in lines
+        ]
+        batches.append({
+            "number": n,
+            "weight": round(sum(line["weight"] for line in lines) / count, 2),
+            "volume_cuft": round(volume / count, 2),
+            "ingredients": batch_lines,
+        })
+    return batches
+
+def plan_run(blends, settings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Build a run sheet for saved ``Blend`` rows.
+
+    Each blend must have its ingredients (with ``ingredient`` loaded) and
+    chemicals available. Raises ValueError if an ingredient is missing or
+    has no usable density, because its volume cannot be computed.
+    """
+    cfg = dict(DEFAULT_SETTINGS)
+    cfg.update({k: v for k, v in (settings or {}).items() if v is not None})
+    capacity = cfg["mixer_capacity_cuft"]
+    if capacity <= 0:
+        raise ValueError("Mixer capacity must be positive")
+
+    ing_bits: Dict[int, int] = {}
+    chem_bits: Dict[int, int] = {}
+    items = []
+    for b in blends:
+        lines = []
+        volume = 0.0
+        if any(bi.ingredient is None for bi in b.ingredients):
+            # The ingredient was deleted after this blend was saved.
+            raise ValueError(f"Blend {b.id} references an ingredient that no longer exists")
+        # Load order in the mixer follows the ingredient's blend_order.
+        for bi in sorted(b.ingredients, key=lambda bi: (bi.ingredient.blend_order or 0, bi.ingredient.name)):
+            ing = bi.ingredient
+            if not ing.density or ing.density <= 0:
+                raise ValueError(f"Ingredient '{ing.name}' has no density")
+            weight = bi.weight or 0.0
+            volume += weight / ing.density
+            lines.append({"name": ing.name, "weight": weight})
+        items.append({
+            "id": b.id,
+            "customer": b.customer.name if b.customer else None,
+            "total_weight": sum(line["weight"] for line in lines),
+            "volume": volume,
+            "lines": lines,
+            "mask": _mask((bi.ingredient_id for bi in b.ingredients), ing_bits),
+            "chem_mask": _mask((bc.chemical_id for bc in b.chemicals), chem_bits),
+        })
+
+    # Untreated blends first, then treated blends grouped by chemical set.
+    # Groups are ordered so the next group shares as many ingredients as possible.
+    plain = [it for it in items if not it["chem_mask"]]
+    groups: Dict[int, List[Dict[str, Any]]] = {}
+    for it in items:
+        if it["chem_mask"]:
+            groups.setdefault(it["chem_mask"], []).append(it)
+
+    sequence = _greedy_order(plain, 0)
+    current = sequence[-1]["mask"] if sequence else 0
+    pending = sorted(groups.items(), key=lambda kv: kv[0])
+    while pending:
+        idx = min(
+            range(len(pending)),
+            key=lambda i: min(_distance(current, it["mask"]) for it in pending[i][1]),
+        )
+        _, members = pending.pop(idx)
+        ordered = _greedy_order(members, current)
+        sequence.extend(ordered)
+        current = ordered[-1]["mask"]
+
+    per_batch = cfg["load_minutes"] + cfg["mix_minutes"] + cfg["discharge_minutes"]
+    runs = []
+    clock = 0.0
+    changeovers = 0
+    cleanouts = 0
+    prev = None
+    for seq, it in enumerate(sequence, start=1):
+        cleanout = prev is not None and prev["chem_mask"] != it["chem_mask"] and bool(prev["chem_mask"])
+        changed = _distance(prev["mask"], it["mask"]) if prev is not None else 0
+        setup = cfg["cleanout_minutes"] if cleanout else changed * cfg["changeover_minutes"]
+        cleanouts += cleanout
+        changeovers += changed
+        batches = _split_batches(it["lines"], it["volume"], capacity)
+        start = clock + setup
+        clock = start + per_batch * len(batches)
+        runs.append({
+            "sequence": seq,
+            "blend_id": it["id"],
+            "customer": it["customer"],
+            "total_weight": round(it["total_weight"], 2),
+            "volume_cuft": round(it["volume"], 2),
+            "treated": bool(it["chem_mask"]),
+            "cleanout_before": cleanout,
+            "changeover_ingredients": changed,
+            "setup_minutes": round(setup, 2),
+            "start_minute": round(start, 2),
+            "end_minute": round(clock, 2),
+            "batches": batches,
+        })
+        prev = it
+
+    return {
+        "runs": runs,
+        "total_batches": sum(len(r["batches"]) for r in runs),
+        "ingredient_changeovers": changeovers,
+        "cleanouts": cleanouts,
+        "total_minutes": round(clock, 2),
+    }
@@ -1,5 +1,6 @@
 from db import Base, engine, SessionLocal
-from models import User, Ingredient, Chemical, Customer
+from models import User, Ingredient, Chemical, Customer, IngredientSnapshot, ChemicalSnapshot
+import crud
 from passlib.context import CryptContext
 
 # Setup for hashing passwords
@@ -49,6 +50,11 @@ def seed():
         db.add_all(customers)
         print("Added example customers")
 
+    # --- Initial price/analysis history ---
+    db.flush()
+    crud.backfill_snapshots(db, Ingredient, IngredientSnapshot)
+    crud.backfill_snapshots(db, Chemical, ChemicalSnapshot)
+
     db.commit()
     db.close()
 